@@ -0,0 +1,80 @@
+from typing import Optional
+
+from cachetools import TTLCache
+
+import database
+from database import EvaluationDTO
+
+# In-process cache in front of the evaluation queries used by the handlers.
+# Reads are served from memory for up to a minute; every write that goes through this module
+# drops the affected entries, so a user never sees stale data after their own changes.
+CACHE_TTL_SECONDS = 60
+
+# (user_id, evaluation_id) -> EvaluationDTO
+_evaluation_cache: TTLCache = TTLCache(maxsize=10_000, ttl=CACHE_TTL_SECONDS)
+# user_id -> {(page, page_size): (list[EvaluationDTO], has_next)}, newest first
+_list_cache: TTLCache = TTLCache(maxsize=1_000, ttl=CACHE_TTL_SECONDS)
+
+
+def _invalidate(user_id: int, evaluation_id: int) -> None:
+    """Drops the cached entry for one evaluation and the owner's cached list pages."""
+    _evaluation_cache.pop((user_id, evaluation_id), None)
+    _list_cache.pop(user_id, None)
+
+
+def get_evaluation_by_id(evaluation_id: int, user_id: int) -> Optional[EvaluationDTO]:
+    """Cached version of database.get_evaluation_by_id."""
+    key = (user_id, evaluation_id)
+    eval_item = _evaluation_cache.get(key)
+    if eval_item is None:
+        eval_item = database.get_evaluation_by_id(evaluation_id, user_id)
+        if eval_item:
+            _evaluation_cache[key] = eval_item
+    return eval_item
+
+
+def get_evaluations_page(user_id: int, page: int, page_size: int) -> tuple[list[EvaluationDTO], bool]:
+    """
+    Cached page of a user's evaluations, newest first. Returns the page and whether another
+    page follows it. Also warms the per-evaluation cache.
+    """
+    pages = _list_cache.get(user_id)
+    if pages is None:
+        pages = _list_cache[user_id] = {}
+    key = (page, page_size)
+    if key not in pages:
+        # Ask for one extra row to learn whether a next page exists
+        evaluations = database.get_evaluations_page(user_id, page_size + 1, page * page_size)
+        result = (evaluations[:page_size], len(evaluations) > page_size)
+        # An empty result may also mean a database error, so it is not cached
+        if not evaluations:
+            return result
+        pages[key] = result
+        for eval_item in result[0]:
+            _evaluation_cache[(user_id, eval_item.id)] = eval_item
+    return pages[key]
+
+
+def save_evaluation(user_id: int, text_note=None, image_file_id=None) -> Optional[EvaluationDTO]:
+    """Saves through database.save_evaluation and invalidates the user's cached list pages."""
+    evaluation = database.save_evaluation(user_id, text_note, image_file_id)
+    if evaluation:
+        _list_cache.pop(user_id, None)
+        _evaluation_cache[(user_id, evaluation.id)] = evaluation
+    return evaluation
+
+
+def update_evaluation_reminder(evaluation_id: int, enabled: bool, user_id: int) -> Optional[EvaluationDTO]:
+    """Updates through database.update_evaluation_reminder and caches the returned evaluation."""
+    eval_item = database.update_evaluation_reminder(evaluation_id, enabled, user_id)
+    _invalidate(user_id, evaluation_id)
+    if eval_item:
+        _evaluation_cache[(user_id, evaluation_id)] = eval_item
+    return eval_item
+
+
+def delete_evaluation(evaluation_id: int, user_id: int) -> bool:
+    """Deletes through database.delete_evaluation and invalidates the affected entries."""
+    deleted = database.delete_evaluation(evaluation_id, user_id)
+    _invalidate(user_id, evaluation_id)
+    return deleted
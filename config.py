@@ -1,7 +1,10 @@
 import os
+from types import SimpleNamespace
 from dotenv import load_dotenv
 
-load_dotenv()
+# Point at the .env next to this file so python-dotenv doesn't have to inspect
+# the call stack and walk parent directories to find it.
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
@@ -14,5 +17,19 @@ PORT = int(os.getenv("PORT", 6000))
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///evaluations.db")
 ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "1254951912")) # ID chat Anda
 
+# Untuk pengembangan: peringatkan jika satu update Telegram (atau satu operasi database di luar update) menjalankan lebih dari N query (0 = nonaktif)
+SQL_QUERY_WARN_THRESHOLD = int(os.getenv("SQL_QUERY_WARN_THRESHOLD", "0"))
+
 if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN environment variable not set. Check .env file.")
\ No newline at end of file
+    raise ValueError("BOT_TOKEN environment variable not set. Check .env file.")
+
+# Semua nilai di atas dalam satu objek, agar modul lain cukup mengikatnya sekali: `from config import CFG`
+CFG = SimpleNamespace(
+    BOT_TOKEN=BOT_TOKEN,
+    WEBHOOK_URL=WEBHOOK_URL,
+    WEBHOOK_PATH=WEBHOOK_PATH,
+    PORT=PORT,
+    DATABASE_URL=DATABASE_URL,
+    ADMIN_CHAT_ID=ADMIN_CHAT_ID,
+    SQL_QUERY_WARN_THRESHOLD=SQL_QUERY_WARN_THRESHOLD,
+)
@@ -1,13 +1,20 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime, date
+from sqlalchemy import create_engine, event, select, insert, update, delete, bindparam, or_, Index, String, Boolean, DateTime, Text, LargeBinary, func
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import datetime, date, time, timezone
 from dataclasses import dataclass
 from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
-import config
+from config import CFG
 
-Base = declarative_base()
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, the form every timestamp in this database is stored in."""
+    # datetime.utcnow() is deprecated since Python 3.12
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Base(DeclarativeBase):
+    pass
 
 # Get a logger for this module
 logger = logging.getLogger(__name__)
@@ -16,7 +23,7 @@ logger = logging.getLogger(__name__)
 # This is used to pass data outside of SQLAlchemy sessions
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class EvaluationDTO:
     id: int
     user_id: int
@@ -26,7 +33,7 @@ class EvaluationDTO:
     reminder_enabled: bool
     last_reminder_sent: Optional[datetime]
 
-@dataclass
+@dataclass(slots=True)
 class DailyJobStateDTO:
     job_name: str
     scheduled_time: datetime
@@ -34,196 +41,332 @@ class DailyJobStateDTO:
 class Evaluation(Base):
     __tablename__ = 'evaluations'
 
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False)
-    text_note = Column(Text, nullable=True)
-    image_file_id = Column(String, nullable=True) # Telegram file_id
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    reminder_enabled = Column(Boolean, default=False)
-    last_reminder_sent = Column(DateTime, nullable=True) # Tracks the last time a reminder was sent
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(nullable=False)
+    text_note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    image_file_id: Mapped[Optional[str]] = mapped_column(String, nullable=True) # Telegram file_id
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, default=utc_now, nullable=True)
+    reminder_enabled: Mapped[Optional[bool]] = mapped_column(Boolean, default=False, nullable=True)
+    last_reminder_sent: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True) # Tracks the last time a reminder was sent
+
+    __table_args__ = (
+        # Backs the scheduler's reminder scan
+        Index('ix_eval_due', 'reminder_enabled', 'last_reminder_sent'),
+        # Backs the per-user listing ordered by newest first
+        Index('ix_eval_user_ts', 'user_id', 'timestamp'),
+    )
 
     def __repr__(self):
         return f"<Evaluation(id={self.id}, user_id={self.user_id}, text='{self.text_note[:20]}...')>"
 
+# Columns in EvaluationDTO field order, so result rows can be passed to the DTO positionally
+_DTO_COLUMNS = (
+    Evaluation.id,
+    Evaluation.user_id,
+    Evaluation.text_note,
+    Evaluation.image_file_id,
+    Evaluation.timestamp,
+    Evaluation.reminder_enabled,
+    Evaluation.last_reminder_sent,
+)
+
 class DailyJobState(Base):
     __tablename__ = 'daily_job_state'
-    job_name = Column(String, primary_key=True)
-    scheduled_time = Column(DateTime, nullable=False)
+    job_name: Mapped[str] = mapped_column(String, primary_key=True)
+    scheduled_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class PersistenceEntry(Base):
+    """One pickled value of the bot's persistence (see persistence.py), e.g. one user's user_data."""
+    __tablename__ = 'persistence_kv'
+    namespace: Mapped[str] = mapped_column(String, primary_key=True)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+# Read statements are built once and reused with bound parameters, so each call
+# skips statement construction and hits SQLAlchemy's compiled cache with a stable key.
+_GET_PAGE_BY_USER_STMT = (
+    select(*_DTO_COLUMNS)
+    .where(Evaluation.user_id == bindparam('uid'))
+    # id breaks timestamp ties, so every row lands on exactly one page
+    .order_by(Evaluation.timestamp.desc(), Evaluation.id.desc())
+    .limit(bindparam('limit'))
+    .offset(bindparam('offset'))
+)
+_GET_BY_ID_STMT = select(*_DTO_COLUMNS).where(
+    Evaluation.id == bindparam('id'), Evaluation.user_id == bindparam('uid')
+)
+# Compares against midnight rather than date(last_reminder_sent) so ix_eval_due can be used.
+# The random sample is picked in SQL, so only the reminders that will be sent leave the database.
+_GET_DUE_SAMPLE_STMT = (
+    select(*_DTO_COLUMNS)
+    .where(
+        Evaluation.reminder_enabled == True,
+        or_(Evaluation.last_reminder_sent == None, Evaluation.last_reminder_sent < bindparam('midnight')),
+    )
+    .order_by(func.random())
+    .limit(bindparam('limit'))
+)
+_GET_PERSISTENCE_NAMESPACE_STMT = select(PersistenceEntry.key, PersistenceEntry.value).where(
+    PersistenceEntry.namespace == bindparam('namespace')
+)
+_GET_JOB_STATE_STMT = select(DailyJobState).where(DailyJobState.job_name == bindparam('job_name'))
+_GET_JOB_SCHEDULED_TIME_STMT = select(DailyJobState.scheduled_time).where(DailyJobState.job_name == bindparam('job_name'))
 
 
 
-# For SQLite, we need to allow access from multiple threads (main bot thread and scheduler thread)
-connect_args = {}
-if 'sqlite' in config.DATABASE_URL:
-    connect_args = {"check_same_thread": False}
+# For SQLite, we need to allow access from multiple threads (main bot thread and scheduler thread).
+# A single shared connection means the file is opened and the PRAGMAs below run only once.
+if 'sqlite' in CFG.DATABASE_URL:
+    engine_options = {
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+        "poolclass": StaticPool,
+    }
+else:
+    engine_options = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+engine = create_engine(CFG.DATABASE_URL, **engine_options)
+
+# WAL lets the scheduler's reads run alongside user writes instead of waiting on them.
+# In-memory databases have no journal file, so they keep the SQLite defaults.
+if CFG.DATABASE_URL.startswith('sqlite') and ':memory:' not in CFG.DATABASE_URL and CFG.DATABASE_URL != 'sqlite://':
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # The shared connection lives for the whole process, so give it a 20 MB page cache
+        # and memory-map the file to serve repeat reads without read() syscalls.
+        cursor.execute("PRAGMA cache_size=-20000")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+# Development aid: count statements and warn when one unit of work issues too many, which is how
+# an N+1 pattern (e.g. a handler calling a helper once per evaluation) would first show up.
+# main.py counts per Telegram update; a scope opened outside an update, e.g. by the scheduler,
+# is counted on its own.
+_query_count: ContextVar[Optional[int]] = ContextVar("_query_count", default=None)
+
+if CFG.SQL_QUERY_WARN_THRESHOLD:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_queries(conn, cursor, statement, parameters, context, executemany):
+        count = _query_count.get()
+        if count is not None:
+            _query_count.set(count + 1)
+
+# INSERT ... ON CONFLICT is dialect-specific, so use the variant for the configured backend
+if engine.dialect.name == 'postgresql':
+    from sqlalchemy.dialects.postgresql import insert as _upsert_insert
+else:
+    from sqlalchemy.dialects.sqlite import insert as _upsert_insert
 
-engine = create_engine(config.DATABASE_URL, connect_args=connect_args)
 Session = sessionmaker(bind=engine)
 
 @contextmanager
 def session_scope():
     """Provide a transactional scope around a series of operations."""
     session = Session()
+    token = _start_scope_query_count()
     try:
         yield session
         session.commit()
     except Exception as e:
-        logger.error(f"Database transaction failed: {e}")
+        logger.error("Database transaction failed: %s", e)
         session.rollback()
         raise
     finally:
         session.close()
+        _check_query_count(token)
+
+@contextmanager
+def read_scope():
+    """Provide a plain connection for read-only queries, without an ORM session or commit."""
+    token = _start_scope_query_count()
+    try:
+        with engine.connect() as conn:
+            yield conn
+    except Exception as e:
+        logger.error("Database read failed: %s", e)
+        raise
+    finally:
+        _check_query_count(token)
+
+def _start_scope_query_count():
+    """Starts a per-scope query counter, unless an update's counter is already running."""
+    if _query_count.get() is not None:
+        return None # The scope's queries add to the update's count
+    return _query_count.set(0)
+
+def _check_query_count(token):
+    """Resets the per-scope query counter and warns if the scope went over the threshold."""
+    if token is None:
+        return
+    query_count = _query_count.get()
+    _query_count.reset(token)
+    _warn_query_count(query_count, "Database scope")
+
+def start_update_query_count():
+    """Starts counting queries for the update being processed; every scope it opens adds to the count."""
+    _query_count.set(0)
+
+def check_update_query_count(update_id: int):
+    """Stops the update's query counter and warns if the update went over the threshold."""
+    query_count = _query_count.get()
+    _query_count.set(None)
+    if query_count is not None:
+        _warn_query_count(query_count, f"Update {update_id}")
+
+def _warn_query_count(query_count: int, source: str):
+    if CFG.SQL_QUERY_WARN_THRESHOLD and query_count > CFG.SQL_QUERY_WARN_THRESHOLD:
+        logger.warning(
+            "%s issued %d queries (threshold %d).",
+            source, query_count, CFG.SQL_QUERY_WARN_THRESHOLD, stack_info=True
+        )
 
 def init_db():
     Base.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add any indexes missing from older databases
+    for index in Evaluation.__table__.indexes:
+        index.create(engine, checkfirst=True)
 
 def save_evaluation(user_id, text_note=None, image_file_id=None) -> Optional[EvaluationDTO]:
     """Saves a new evaluation to the database and returns a DTO, or None on failure."""
-    evaluation = Evaluation(
-        user_id=user_id,
-        text_note=text_note,
-        image_file_id=image_file_id
-    )
     try:
         with session_scope() as session:
-            session.add(evaluation)
-            session.flush() # Use flush to get the ID before the transaction is committed
-
-            # Create DTO before session closes to avoid session-related issues
-            evaluation_dto = EvaluationDTO(
-                id=evaluation.id,
-                user_id=evaluation.user_id,
-                text_note=evaluation.text_note,
-                image_file_id=evaluation.image_file_id,
-                timestamp=evaluation.timestamp,
-                reminder_enabled=evaluation.reminder_enabled,
-                last_reminder_sent=evaluation.last_reminder_sent
-            )
-            logger.info(f"Successfully saved evaluation with ID {evaluation.id} for user {user_id}.")
+            # RETURNING hands back the generated id and column defaults from the INSERT itself
+            row = session.execute(
+                insert(Evaluation)
+                .values(user_id=user_id, text_note=text_note, image_file_id=image_file_id)
+                .returning(*_DTO_COLUMNS)
+            ).one()
+            evaluation_dto = EvaluationDTO(*row)
+            logger.info("Successfully saved evaluation with ID %s for user %s.", evaluation_dto.id, user_id)
             return evaluation_dto
     except Exception:
         # The session_scope already logged the specific error
-        logger.error(f"Could not save evaluation for user {user_id}.")
+        logger.error("Could not save evaluation for user %s.", user_id)
         return None
 
-def get_all_evaluations(user_id) -> list[EvaluationDTO]:
-    """Fetches all evaluations for a specific user."""
+def get_evaluations_page(user_id, limit: int, offset: int) -> list[EvaluationDTO]:
+    """Fetches up to `limit` evaluations for a user, newest first, skipping the first `offset`."""
     try:
-        with session_scope() as session:
-            evaluations = session.query(Evaluation).filter_by(user_id=user_id).order_by(Evaluation.timestamp.desc()).all()
-            return [
-                EvaluationDTO(
-                    id=eval.id,
-                    user_id=eval.user_id,
-                    text_note=eval.text_note,
-                    image_file_id=eval.image_file_id,
-                    timestamp=eval.timestamp,
-                    reminder_enabled=eval.reminder_enabled,
-                    last_reminder_sent=eval.last_reminder_sent
-                ) for eval in evaluations
-            ]
+        with read_scope() as conn:
+            rows = conn.execute(_GET_PAGE_BY_USER_STMT, {'uid': user_id, 'limit': limit, 'offset': offset})
+            return [EvaluationDTO(*row) for row in rows]
     except Exception:
-        # The session_scope already logged the specific error
-        logger.error(f"Could not fetch evaluations for user {user_id}.")
+        # The read_scope already logged the specific error
+        logger.error("Could not fetch evaluations page (offset %s) for user %s.", offset, user_id)
         return []
 
 def get_evaluation_by_id(evaluation_id: int, user_id: int) -> Optional[EvaluationDTO]:
     """Fetches a single evaluation by its ID, ensuring it belongs to the user."""
     try:
-        with session_scope() as session:
-            eval_item = session.query(Evaluation).filter_by(id=evaluation_id, user_id=user_id).first()
-            if eval_item:
-                return EvaluationDTO(
-                    id=eval_item.id,
-                    user_id=eval_item.user_id,
-                    text_note=eval_item.text_note,
-                    image_file_id=eval_item.image_file_id,
-                    timestamp=eval_item.timestamp,
-                    reminder_enabled=eval_item.reminder_enabled,
-                    last_reminder_sent=eval_item.last_reminder_sent
-                )
+        with read_scope() as conn:
+            row = conn.execute(_GET_BY_ID_STMT, {'id': evaluation_id, 'uid': user_id}).first()
+            if row:
+                return EvaluationDTO(*row)
             return None
     except Exception:
-        # The session_scope already logged the specific error
-        logger.error(f"Could not fetch evaluation {evaluation_id} for user {user_id}.")
+        # The read_scope already logged the specific error
+        logger.error("Could not fetch evaluation %s for user %s.", evaluation_id, user_id)
         return None
 
-def get_all_active_reminders() -> list[EvaluationDTO]:
-    """Fetches all evaluations with reminder_enabled set to True."""
+def get_due_reminders_sample(limit: int = 2) -> list[EvaluationDTO]:
+    """Fetches up to `limit` random active reminders that have not been sent yet today (UTC)."""
+    today_midnight = datetime.combine(utc_now().date(), time.min)
     try:
-        with session_scope() as session:
-            evaluations = session.query(Evaluation).filter_by(reminder_enabled=True).all()
-            return [
-                EvaluationDTO(
-                    id=eval.id, user_id=eval.user_id, text_note=eval.text_note,
-                    image_file_id=eval.image_file_id, timestamp=eval.timestamp,
-                    reminder_enabled=eval.reminder_enabled,
-                    last_reminder_sent=eval.last_reminder_sent
-                ) for eval in evaluations
-            ]
+        with read_scope() as conn:
+            rows = conn.execute(_GET_DUE_SAMPLE_STMT, {'midnight': today_midnight, 'limit': limit})
+            return [EvaluationDTO(*row) for row in rows]
     except Exception:
-        logger.error("Failed to fetch all active reminders due to a database error.")
+        logger.error("Failed to fetch due reminders due to a database error.")
         return []
 
 def delete_evaluation(evaluation_id, user_id):
     """Deletes an evaluation from the database if it belongs to the user."""
     try:
         with session_scope() as session:
-            # Find the evaluation and ensure it belongs to the correct user
-            evaluation = session.query(Evaluation).filter_by(id=evaluation_id, user_id=user_id).first()
-            if evaluation:
-                session.delete(evaluation)
-                logger.info(f"Successfully deleted evaluation with ID {evaluation_id} for user {user_id}.")
+            # Scope the delete to the owner; rowcount tells us whether anything matched
+            result = session.execute(
+                delete(Evaluation).where(Evaluation.id == evaluation_id, Evaluation.user_id == user_id)
+            )
+            if result.rowcount:
+                logger.info("Successfully deleted evaluation with ID %s for user %s.", evaluation_id, user_id)
                 return True
             else:
                 # Evaluation not found or doesn't belong to the user
-                logger.warning(f"Attempt to delete non-existent or unauthorized evaluation ID {evaluation_id} by user {user_id}.")
+                logger.warning("Attempt to delete non-existent or unauthorized evaluation ID %s by user %s.", evaluation_id, user_id)
                 return False
     except Exception:
-        logger.error(f"Failed to delete evaluation ID {evaluation_id} for user {user_id} due to a database error.")
+        logger.error("Failed to delete evaluation ID %s for user %s due to a database error.", evaluation_id, user_id)
         return False
 
-def update_evaluation_reminder(evaluation_id, enabled):
-    """Updates the reminder status for a given evaluation and returns True on success."""
+def update_evaluation_reminder(evaluation_id, enabled, user_id=None) -> Optional[EvaluationDTO]:
+    """
+    Updates the reminder status for a given evaluation, optionally only if it belongs to user_id.
+    Returns the updated DTO, or None if it was not found or on failure.
+    """
     try:
         with session_scope() as session:
-            evaluation = session.query(Evaluation).filter_by(id=evaluation_id).first()
-            if not evaluation:
-                logger.warning(f"Attempted to update non-existent evaluation ID {evaluation_id}.")
-                return False # Not found
-            
-            evaluation.reminder_enabled = enabled
+            values = {"reminder_enabled": enabled}
             if not enabled:
-                evaluation.last_reminder_sent = None
-            
-            return True
+                values["last_reminder_sent"] = None
+            stmt = update(Evaluation).where(Evaluation.id == evaluation_id)
+            if user_id is not None:
+                stmt = stmt.where(Evaluation.user_id == user_id)
+            # RETURNING gives the caller the updated row without a follow-up SELECT
+            row = session.execute(stmt.values(**values).returning(*_DTO_COLUMNS)).first()
+            if row is None:
+                logger.warning("Attempted to update non-existent evaluation ID %s.", evaluation_id)
+                return None # Not found
+
+            return EvaluationDTO(*row)
     except Exception:
-        logger.error(f"Failed to update reminder for evaluation ID {evaluation_id} due to a database error.")
-        return False
+        logger.error("Failed to update reminder for evaluation ID %s due to a database error.", evaluation_id)
+        return None
+
+# Stays well under SQLite's bound-parameter limit for the IN (...) list
+_MARK_SENT_CHUNK_SIZE = 500
 
-def update_last_reminder_sent(evaluation_id):
-    """Updates the last_reminder_sent timestamp for a given evaluation."""
+def mark_reminders_sent(evaluation_ids: list[int]):
+    """Sets last_reminder_sent to now for all given evaluations in a single transaction."""
+    if not evaluation_ids:
+        return
+    sent_at = utc_now()
     try:
         with session_scope() as session:
-            evaluation = session.query(Evaluation).filter_by(id=evaluation_id).first()
-            if evaluation:
-                evaluation.last_reminder_sent = datetime.utcnow()
+            for start in range(0, len(evaluation_ids), _MARK_SENT_CHUNK_SIZE):
+                chunk = evaluation_ids[start:start + _MARK_SENT_CHUNK_SIZE]
+                session.execute(
+                    update(Evaluation).where(Evaluation.id.in_(chunk)).values(last_reminder_sent=sent_at)
+                )
     except Exception:
-        logger.error(f"Failed to update last_reminder_sent for evaluation ID {evaluation_id} due to a database error.")
+        logger.error("Failed to mark %s reminders as sent due to a database error.", len(evaluation_ids))
 
 def get_or_create_job_state(job_name: str) -> DailyJobStateDTO:
     """Gets the state for a job, creating it if it doesn't exist."""
     try:
         with session_scope() as session:
-            job_state = session.query(DailyJobState).filter_by(job_name=job_name).first()
-            if not job_state:
-                # Create a default state in the past to trigger scheduling on first run
-                job_state = DailyJobState(job_name=job_name, scheduled_time=datetime(1970, 1, 1))
-                session.add(job_state)
-                logger.info(f"Created initial state for job '{job_name}'.")
-            return DailyJobStateDTO(job_name=job_state.job_name, scheduled_time=job_state.scheduled_time)
+            # Create a default state in the past to trigger scheduling on first run.
+            # ON CONFLICT DO NOTHING makes this atomic, with no SELECT-then-INSERT race between callers.
+            result = session.execute(
+                _upsert_insert(DailyJobState)
+                .values(job_name=job_name, scheduled_time=datetime(1970, 1, 1))
+                .on_conflict_do_nothing(index_elements=['job_name'])
+            )
+            if result.rowcount:
+                logger.info("Created initial state for job '%s'.", job_name)
+            scheduled_time = session.execute(_GET_JOB_SCHEDULED_TIME_STMT, {'job_name': job_name}).scalar_one()
+            return DailyJobStateDTO(job_name=job_name, scheduled_time=scheduled_time)
     except Exception:
-        logger.error(f"Failed to get or create state for job '{job_name}'.")
+        logger.error("Failed to get or create state for job '%s'.", job_name)
         # Return a default past date on error to allow the bot to attempt to run
         return DailyJobStateDTO(job_name=job_name, scheduled_time=datetime(1970, 1, 1))
 
@@ -231,12 +374,46 @@ def update_job_state(job_name: str, new_scheduled_time: datetime):
     """Updates the scheduled time for a job."""
     try:
         with session_scope() as session:
-            job_state = session.query(DailyJobState).filter_by(job_name=job_name).first()
+            job_state = session.execute(_GET_JOB_STATE_STMT, {'job_name': job_name}).scalar_one_or_none()
             if job_state:
                 job_state.scheduled_time = new_scheduled_time
-                logger.info(f"Updated scheduled time for job '{job_name}' to {new_scheduled_time}.")
+                logger.info("Updated scheduled time for job '%s' to %s.", job_name, new_scheduled_time)
                 return True
             return False
     except Exception:
-        logger.error(f"Failed to update state for job '{job_name}'.")
-        return False
\ No newline at end of file
+        logger.error("Failed to update state for job '%s'.", job_name)
+        return False
+
+def load_persistence_namespace(namespace: str) -> dict[str, bytes]:
+    """Returns every stored key and pickled value of one persistence namespace."""
+    try:
+        with read_scope() as conn:
+            return dict(conn.execute(_GET_PERSISTENCE_NAMESPACE_STMT, {'namespace': namespace}).all())
+    except Exception:
+        logger.error("Failed to load persistence namespace '%s'.", namespace)
+        return {}
+
+def save_persistence_entry(namespace: str, key: str, value: bytes) -> bool:
+    """Inserts or replaces a single persistence value."""
+    try:
+        with session_scope() as session:
+            stmt = _upsert_insert(PersistenceEntry).values(namespace=namespace, key=key, value=value)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['namespace', 'key'], set_={'value': stmt.excluded.value}
+            ))
+            return True
+    except Exception:
+        logger.error("Failed to save persistence entry '%s' in '%s'.", key, namespace)
+        return False
+
+def delete_persistence_entry(namespace: str, key: str) -> bool:
+    """Deletes a single persistence value, if present."""
+    try:
+        with session_scope() as session:
+            session.execute(
+                delete(PersistenceEntry).where(PersistenceEntry.namespace == namespace, PersistenceEntry.key == key)
+            )
+            return True
+    except Exception:
+        logger.error("Failed to delete persistence entry '%s' in '%s'.", key, namespace)
+        return False
@@ -1,8 +1,11 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Update, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext, ConversationHandler
 import database
+import cache
 import logging
 from datetime import datetime
+from functools import lru_cache, wraps
+from typing import Final
 import message_formatter # Import the new module
 
 # Get a logger for this module
@@ -11,40 +14,88 @@ logger = logging.getLogger(__name__)
 # States for conversation handler
 TEXT_NOTE, IMAGE_NOTE = range(2)
 
+# Static replies, built once at import instead of on every handler call
+WELCOME_HTML: Final = (
+    "👋 Halo! Saya adalah <b>Bot Evaluasi Trading</b> Anda. "
+    "Saya bisa membantu Anda menyimpan catatan pembelajaran reaksi pasar atau ide, "
+    "termasuk gambar, dan mengingatkan Anda setiap hari. 📈\n\n"
+    "Gunakan /new_evaluation untuk menambahkan catatan baru.\n"
+    "Gunakan /list_evaluations untuk melihat catatan Anda."
+)
+ASK_TEXT_NOTE_HTML: Final = (
+    "📝 Silakan kirim <b>catatan teks</b> Anda untuk evaluasi ini. "
+    "Anda juga bisa mengirim gambar setelahnya."
+)
+TEXT_NOTE_RECEIVED_HTML: Final = (
+    "✅ Catatan teks diterima! Sekarang, jika Anda ingin menambahkan gambar, "
+    "silakan kirim gambarnya. Jika tidak, ketik /done untuk menyimpan."
+)
+IMAGE_RECEIVED_HTML: Final = "📸 Gambar diterima! Ketik /done untuk menyimpan evaluasi ini."
+NOTHING_TO_SAVE_TEXT: Final = "Tidak ada catatan atau gambar yang diberikan. Evaluasi dibatalkan."
+SAVED_HTML_TEMPLATE: Final = (
+    "✅ Evaluasi Anda telah disimpan! <b>ID: {eval_id}</b>\n\n"
+    "Anda dapat mengaktifkan pengingat harian acak dari /list_evaluations."
+)
+SAVE_FAILED_HTML: Final = "❌ Maaf, terjadi kesalahan saat menyimpan evaluasi Anda. Silakan coba lagi."
+IMAGE_OR_DONE_ONLY_HTML: Final = (
+    "⚠️ Mohon maaf, saya hanya bisa menerima gambar atau perintah /done. "
+    "Silakan kirim gambar atau ketik /done."
+)
+CANCELLED_HTML: Final = "❌ Operasi telah dibatalkan."
+WAITING_FOR_INPUT_HTML: Final = (
+    "⚠️ Saya sedang menunggu masukan untuk operasi sebelumnya. "
+    "Silakan selesaikan operasi tersebut, atau ketik /cancel untuk membatalkan."
+)
+NO_EVALUATIONS_HTML: Final = "Anda belum memiliki catatan evaluasi. Gunakan /new_evaluation untuk membuat yang pertama! ✨"
+NO_MORE_EVALUATIONS_HTML: Final = "Tidak ada catatan evaluasi lainnya."
+MORE_EVALUATIONS_HTML: Final = "📄 Masih ada catatan evaluasi lainnya."
+
+# Evaluations sent per /list_evaluations page; the rest are behind a "Berikutnya" button
+EVALUATIONS_PAGE_SIZE: Final = 10
+
 def _create_evaluation_keyboard(eval_item: database.EvaluationDTO) -> InlineKeyboardMarkup:
     """Helper function to create the dynamic inline keyboard for an evaluation."""
+    return _keyboard_for(eval_item.id, eval_item.reminder_enabled)
+
+@lru_cache(maxsize=4096)
+def _keyboard_for(eval_id: int, reminder_enabled: bool) -> InlineKeyboardMarkup:
+    """
+    Builds the keyboard for one evaluation. The layout depends only on these two values and
+    PTB markup objects are immutable, so a cached instance can be reused across renders.
+    """
     keyboard = []
     first_row = []
     
-    if eval_item.reminder_enabled:
-        first_row.append(InlineKeyboardButton("🚫 Nonaktifkan Pengingat", callback_data=f"disable_reminder_{eval_item.id}"))
+    if reminder_enabled:
+        first_row.append(InlineKeyboardButton("🚫 Nonaktifkan Pengingat", callback_data=f"disable_reminder_{eval_id}"))
     else:
-        first_row.append(InlineKeyboardButton("🔔 Aktifkan Pengingat", callback_data=f"enable_reminder_{eval_item.id}"))
+        first_row.append(InlineKeyboardButton("🔔 Aktifkan Pengingat", callback_data=f"enable_reminder_{eval_id}"))
         
     keyboard.append(first_row)
     # The delete button is always present on its own row for safety and clarity
-    keyboard.append([InlineKeyboardButton("🗑️ Hapus", callback_data=f"delete_eval_{eval_item.id}")])
+    keyboard.append([InlineKeyboardButton("🗑️ Hapus", callback_data=f"delete_eval_{eval_id}")])
     
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=256)
+def _delete_confirm_keyboard(eval_id: int) -> InlineKeyboardMarkup:
+    """Builds (once per evaluation) the confirm/cancel keyboard shown before deleting."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("✅ Ya, Hapus", callback_data=f"confirm_delete_{eval_id}"),
+            InlineKeyboardButton("❌ Batal", callback_data=f"cancel_delete_{eval_id}")
+        ]
+    ])
+
 
 async def start_command(update: Update, context: CallbackContext) -> None:
     """Sends a welcome message and explains bot usage."""
-    await update.message.reply_html( # Gunakan HTML untuk formatting
-        "👋 Halo! Saya adalah <b>Bot Evaluasi Trading</b> Anda. "
-        "Saya bisa membantu Anda menyimpan catatan pembelajaran reaksi pasar atau ide, "
-        "termasuk gambar, dan mengingatkan Anda setiap hari. 📈\n\n"
-        "Gunakan /new_evaluation untuk menambahkan catatan baru.\n"
-        "Gunakan /list_evaluations untuk melihat catatan Anda."
-    )
+    await update.message.reply_text(WELCOME_HTML)
 
 async def new_evaluation_command(update: Update, context: CallbackContext) -> int:
     """Starts the conversation to add a new evaluation."""
     logger.info("new_evaluation_command called. User: %s. Setting state to TEXT_NOTE.", update.effective_user.id)
-    await update.message.reply_html( # Gunakan HTML untuk formatting
-        "📝 Silakan kirim <b>catatan teks</b> Anda untuk evaluasi ini. "
-        "Anda juga bisa mengirim gambar setelahnya."
-    )
+    await update.message.reply_text(ASK_TEXT_NOTE_HTML)
     return TEXT_NOTE
 
 async def receive_text_note(update: Update, context: CallbackContext) -> int:
@@ -52,16 +103,13 @@ async def receive_text_note(update: Update, context: CallbackContext) -> int:
     logger.info("receive_text_note called. User: %s.", update.effective_user.id)
     user_id = update.effective_user.id
     text_note = update.message.text
-    logger.info(f"Received text note from user {user_id}: '{text_note[:50]}...'")
+    logger.info("Received text note from user %s: '%.50s...'", user_id, text_note)
     
     # Store the text temporarily in user_data
     context.user_data['current_evaluation_text'] = text_note
     context.user_data['current_evaluation_image_file_id'] = None # Reset image_file_id
 
-    await update.message.reply_html( # Gunakan HTML untuk formatting
-        "✅ Catatan teks diterima! Sekarang, jika Anda ingin menambahkan gambar, "
-        "silakan kirim gambarnya. Jika tidak, ketik /done untuk menyimpan."
-    )
+    await update.message.reply_text(TEXT_NOTE_RECEIVED_HTML)
     logger.info("Replied to user and transitioned to IMAGE_NOTE state.")
     return IMAGE_NOTE
 
@@ -73,9 +121,7 @@ async def receive_image_note(update: Update, context: CallbackContext) -> int:
         # Get the file_id of the largest photo
         file_id = update.message.photo[-1].file_id
         context.user_data['current_evaluation_image_file_id'] = file_id
-        await update.message.reply_html( # Gunakan HTML untuk formatting
-            "📸 Gambar diterima! Ketik /done untuk menyimpan evaluasi ini."
-        )
+        await update.message.reply_text(IMAGE_RECEIVED_HTML)
         return IMAGE_NOTE # Stay in IMAGE_NOTE state to allow more images (though we only store one file_id)
     elif update.message.text and update.message.text.lower() == '/done':
         # User finished adding notes/images
@@ -83,122 +129,166 @@ async def receive_image_note(update: Update, context: CallbackContext) -> int:
         image_file_id = context.user_data.get('current_evaluation_image_file_id')
 
         if not text_note and not image_file_id:
-            await update.message.reply_text("Tidak ada catatan atau gambar yang diberikan. Evaluasi dibatalkan.")
+            await update.message.reply_text(NOTHING_TO_SAVE_TEXT)
+            context.user_data.clear() # Every END leaves user_data empty
             return ConversationHandler.END
 
-        evaluation = database.save_evaluation(user_id, text_note, image_file_id)        
+        evaluation = cache.save_evaluation(user_id, text_note, image_file_id)        
         if evaluation:
-            await update.message.reply_html(
-                f"✅ Evaluasi Anda telah disimpan! <b>ID: {evaluation.id}</b>\n\n"
-                "Anda dapat mengaktifkan pengingat harian acak dari /list_evaluations."
-            )
+            await update.message.reply_text(SAVED_HTML_TEMPLATE.format(eval_id=evaluation.id))
         else:
-            await update.message.reply_html( # Gunakan HTML untuk formatting
-                "❌ Maaf, terjadi kesalahan saat menyimpan evaluasi Anda. Silakan coba lagi."
-            )
+            await update.message.reply_text(SAVE_FAILED_HTML)
         # Clear all temporary data to ensure a clean state, consistent with cancel/skip
         context.user_data.clear()
         return ConversationHandler.END
     else:
-        await update.message.reply_html( # Gunakan HTML untuk formatting
-            "⚠️ Mohon maaf, saya hanya bisa menerima gambar atau perintah /done. "
-            "Silakan kirim gambar atau ketik /done."
-        )
+        await update.message.reply_text(IMAGE_OR_DONE_ONLY_HTML)
         return IMAGE_NOTE
 
 async def cancel_command(update: Update, context: CallbackContext) -> int:
     """Cancels the current conversation and clears all temporary user data."""
     logger.info("cancel_command called. User: %s.", update.effective_user.id)
-    await update.message.reply_html("❌ Operasi telah dibatalkan.")
+    await update.message.reply_text(CANCELLED_HTML)
     # Clear all temporary data to prevent state leakage between different conversations
     context.user_data.clear()
     return ConversationHandler.END
 
 async def unknown_command_in_conv(update: Update, context: CallbackContext) -> None:
     """Handles any unknown command sent during a conversation."""
-    await update.message.reply_html(
-        "⚠️ Saya sedang menunggu masukan untuk operasi sebelumnya. "
-        "Silakan selesaikan operasi tersebut, atau ketik /cancel untuk membatalkan."
-    )
+    await update.message.reply_text(WAITING_FOR_INPUT_HTML)
     # We return None, so the conversation state does not change.
 
-async def list_evaluations_command(update: Update, context: CallbackContext) -> None:
-    """Lists all evaluations for the user."""
-    logger.info("list_evaluations_command called. User: %s.", update.effective_user.id)
-    user_id = update.effective_user.id
-    evaluations = database.get_all_evaluations(user_id)
+@lru_cache(maxsize=256)
+def _next_page_keyboard(page: int) -> InlineKeyboardMarkup:
+    """Keyboard with the single button that requests the given page of evaluations."""
+    return InlineKeyboardMarkup([[InlineKeyboardButton("Berikutnya →", callback_data=f"list_page_{page}")]])
+
+async def _send_evaluations_page(bot: Bot, chat_id: int, user_id: int, page: int) -> None:
+    """
+    Sends one page of the user's evaluations to the chat. Sends by chat id rather than replying,
+    because a button's message may be an InaccessibleMessage, which cannot be replied to.
+    """
+    evaluations, has_next = cache.get_evaluations_page(user_id, page, EVALUATIONS_PAGE_SIZE)
 
     if not evaluations:
-        await update.message.reply_html("Anda belum memiliki catatan evaluasi. Gunakan /new_evaluation untuk membuat yang pertama! ✨")
+        await bot.send_message(chat_id, NO_EVALUATIONS_HTML if page == 0 else NO_MORE_EVALUATIONS_HTML)
         return
 
+    # Sent one after another, like the scheduler does for one chat: concurrent sends would arrive
+    # in any order and the listing would no longer be newest-first. A page holds at most 10.
     for eval_item in evaluations:
         # Use the new message formatter
         formatted_text, _ = message_formatter.format_evaluation_message(eval_item)
         reply_markup = _create_evaluation_keyboard(eval_item)
-        await update.message.reply_html(formatted_text, reply_markup=reply_markup)
+        try:
+            await bot.send_message(chat_id, formatted_text, reply_markup=reply_markup)
+        except Exception as e:
+            logger.error("Gagal mengirim evaluasi %s ke user %s: %s", eval_item.id, user_id, e)
+
+    # Sent only after the page has gone out, so the button always ends up below it
+    if has_next:
+        await bot.send_message(chat_id, MORE_EVALUATIONS_HTML, reply_markup=_next_page_keyboard(page + 1))
+
+async def list_evaluations_command(update: Update, context: CallbackContext) -> None:
+    """Lists the first page of evaluations for the user."""
+    logger.info("list_evaluations_command called. User: %s.", update.effective_user.id)
+    await _send_evaluations_page(context.bot, update.effective_chat.id, update.effective_user.id, 0)
 
-async def button_callback_handler(update: Update, context: CallbackContext) -> None:
-    """Handles inline keyboard button presses."""
+async def list_page_callback(update: Update, context: CallbackContext) -> None:
+    """Handles the 'Berikutnya' button by sending the requested page of evaluations."""
     query = update.callback_query
     await query.answer() # Acknowledge the button press
+    logger.info("list_page_callback received callback_data: %s", query.data)
+    await _send_evaluations_page(context.bot, update.effective_chat.id, query.from_user.id, int(context.matches[0].group(1)))
 
-    data = query.data
-    logger.info(f"button_callback_handler received callback_data: {data}") # Tambahkan baris ini
-    user_id = query.from_user.id # For security checks (tetap diperlukan untuk logika hapus)
+def _callback_action(action=None, *, answer_first: bool = True):
+    """
+    Wraps an action coroutine taking (query, context, evaluation_id, user_id) into a PTB callback.
+    The evaluation id comes from the first group of the handler's pattern (context.matches).
+    With answer_first=False the action must answer the query itself, e.g. to show its own toast.
+    """
+    if action is None:
+        return lambda action: _callback_action(action, answer_first=answer_first)
 
-    if data.startswith("enable_reminder_") or data.startswith("disable_reminder_"):
-        is_enabling = data.startswith("enable_reminder_")
-        evaluation_id = int(data.split("_")[2])
-        success = database.update_evaluation_reminder(evaluation_id, is_enabling)
-        
-        if success:
-            # Refetch the updated evaluation to rebuild the message and keyboard
-            eval_item: database.EvaluationDTO = database.get_evaluation_by_id(evaluation_id, user_id)
-            if eval_item:
-                # Regenerate message and keyboard
-                formatted_text, _ = message_formatter.format_evaluation_message(eval_item)
-                reply_markup = _create_evaluation_keyboard(eval_item)
-                await query.edit_message_text(text=formatted_text, reply_markup=reply_markup, parse_mode='HTML')
-                feedback_text = "Pengingat diaktifkan!" if is_enabling else "Pengingat dinonaktifkan!"
-                await query.answer(feedback_text) # Give feedback via toast
-            else:
-                # Fallback if refetch fails
-                await query.edit_message_text(f"Status pengingat untuk Evaluasi ID <b>{evaluation_id}</b> telah diperbarui.", parse_mode='HTML')
-        else:
-            await query.answer("Gagal memperbarui status pengingat.", show_alert=True)
-
-    # --- Deletion Logic ---
-    elif data.startswith("delete_eval_"):
-        evaluation_id = int(data.split("_")[2])
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ Ya, Hapus", callback_data=f"confirm_delete_{evaluation_id}"),
-                InlineKeyboardButton("❌ Batal", callback_data=f"cancel_delete_{evaluation_id}")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text( # Gunakan HTML untuk formatting
-            text=f"🗑️ Apakah Anda yakin ingin menghapus Evaluasi ID: <b>{evaluation_id}</b> secara permanen?",
-            reply_markup=reply_markup
-        )
-    elif data.startswith("confirm_delete_"):
-        evaluation_id = int(data.split("_")[2])
-        # Pass user_id to the delete function for security
-        deleted = database.delete_evaluation(evaluation_id=evaluation_id, user_id=user_id)
-        if deleted:
-            await query.edit_message_text(f"✅ Evaluasi ID: <b>{evaluation_id}</b> telah berhasil dihapus.", parse_mode='HTML')
-        else:
-            await query.edit_message_text("❌ Gagal menghapus evaluasi. Mungkin evaluasi tersebut sudah tidak ada atau bukan milik Anda.")
-    elif data.startswith("cancel_delete_"):
-        # The user cancelled the deletion. Restore the original message.
-        evaluation_id: int = int(data.split("_")[2])
-        eval_item: database.EvaluationDTO = database.get_evaluation_by_id(evaluation_id, user_id)
-        if eval_item:
-            # Restore the original message and keyboard
-            formatted_text, _ = message_formatter.format_evaluation_message(eval_item)
-            reply_markup = _create_evaluation_keyboard(eval_item)
-            await query.edit_message_text(text=formatted_text, reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            # Fallback if the item was deleted in the meantime or not found
-            await query.edit_message_text("👍 Penghapusan dibatalkan.")
\ No newline at end of file
+    @wraps(action)
+    async def callback(update: Update, context: CallbackContext) -> None:
+        query = update.callback_query
+        if answer_first:
+            await query.answer() # Acknowledge the button press
+        logger.info("%s received callback_data: %s", action.__name__, query.data)
+        await action(query, context, int(context.matches[0].group(1)), query.from_user.id)
+    return callback
+
+async def _toggle_reminder(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int, is_enabling: bool) -> None:
+    """Enables or disables the reminder for an evaluation and redraws its message."""
+    current = cache.get_evaluation_by_id(evaluation_id, user_id)
+    if current is None:
+        await query.answer("Gagal memperbarui status pengingat.", show_alert=True)
+        return
+    if current.reminder_enabled == is_enabling:
+        # Stale button: nothing to write and nothing to redraw (the edit would fail with "message is not modified")
+        await query.answer("Status sudah sesuai.")
+        return
+
+    # The update returns the fresh evaluation, so the message can be rebuilt without a refetch
+    eval_item = cache.update_evaluation_reminder(evaluation_id, is_enabling, user_id)
+    
+    if eval_item:
+        # Regenerate message and keyboard
+        formatted_text, _ = message_formatter.format_evaluation_message(eval_item)
+        reply_markup = _create_evaluation_keyboard(eval_item)
+        feedback_text = "Pengingat diaktifkan!" if is_enabling else "Pengingat dinonaktifkan!"
+        # The toast is purely cosmetic, so fire it in the background instead of waiting on its round-trip
+        context.application.create_task(query.answer(feedback_text)) # Give feedback via toast
+        try:
+            await query.edit_message_text(text=formatted_text, reply_markup=reply_markup)
+        except Exception as e:
+            logger.error("Gagal memperbarui tampilan pengingat untuk eval %s: %s", evaluation_id, e)
+    else:
+        await query.answer("Gagal memperbarui status pengingat.", show_alert=True)
+
+@_callback_action(answer_first=False)
+async def enable_reminder_callback(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int) -> None:
+    """Turns on the daily reminder for an evaluation."""
+    await _toggle_reminder(query, context, evaluation_id, user_id, True)
+
+@_callback_action(answer_first=False)
+async def disable_reminder_callback(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int) -> None:
+    """Turns off the daily reminder for an evaluation."""
+    await _toggle_reminder(query, context, evaluation_id, user_id, False)
+
+# --- Deletion Logic ---
+@_callback_action
+async def delete_eval_callback(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int) -> None:
+    """Asks the user to confirm deleting an evaluation."""
+    await query.edit_message_text(
+        text=f"🗑️ Apakah Anda yakin ingin menghapus Evaluasi ID: <b>{evaluation_id}</b> secara permanen?",
+        reply_markup=_delete_confirm_keyboard(evaluation_id)
+    )
+
+@_callback_action
+async def confirm_delete_callback(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int) -> None:
+    """Deletes the evaluation after the user confirmed."""
+    # Skip the DELETE when the evaluation is already gone (e.g. confirm pressed twice)
+    # Pass user_id to the delete function for security
+    deleted = (
+        cache.get_evaluation_by_id(evaluation_id, user_id) is not None
+        and cache.delete_evaluation(evaluation_id=evaluation_id, user_id=user_id)
+    )
+    if deleted:
+        await query.edit_message_text(f"✅ Evaluasi ID: <b>{evaluation_id}</b> telah berhasil dihapus.")
+    else:
+        await query.edit_message_text("❌ Gagal menghapus evaluasi. Mungkin evaluasi tersebut sudah tidak ada atau bukan milik Anda.")
+
+@_callback_action
+async def cancel_delete_callback(query: CallbackQuery, context: CallbackContext, evaluation_id: int, user_id: int) -> None:
+    """The user cancelled the deletion. Restore the original message."""
+    eval_item: database.EvaluationDTO = cache.get_evaluation_by_id(evaluation_id, user_id)
+    if eval_item:
+        # Restore the original message and keyboard
+        formatted_text, _ = message_formatter.format_evaluation_message(eval_item)
+        reply_markup = _create_evaluation_keyboard(eval_item)
+        await query.edit_message_text(text=formatted_text, reply_markup=reply_markup)
+    else:
+        # Fallback if the item was deleted in the meantime or not found
+        await query.edit_message_text("👍 Penghapusan dibatalkan.")
@@ -1,87 +1,176 @@
+import atexit
 import logging
+from collections import OrderedDict
 import os
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ConversationHandler, CallbackQueryHandler, PicklePersistence, CallbackContext, TypeHandler, ApplicationHandlerStop
-from telegram import Update, BotCommand
-import config
+import queue
+import re
+from logging.handlers import QueueHandler, QueueListener
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, ConversationHandler, CallbackQueryHandler, CallbackContext, TypeHandler, BaseHandler, ApplicationHandlerStop, AIORateLimiter, Defaults
+from telegram import Update, BotCommand, LinkPreviewOptions
+from telegram.constants import ParseMode
+from telegram.request import HTTPXRequest
+from config import CFG
 import database
 import handlers
+import persistence
 import scheduler
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
+# Enable logging. Handlers only push records onto a queue; a listener thread formats and
+# writes them, so the event loop never waits on stream I/O.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_queue_handler = QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s")) # Full format is applied by the listener
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop) # Flush queued records on exit
 logger = logging.getLogger(__name__)
 
-# New function for access control
 telegram_app: Application = None
 
-async def pre_update_callback(update: Update, context: CallbackContext) -> None: # type: ignore
+# Access control: every handler only accepts updates from the owner, so PTB skips other
+# users' updates while matching handlers instead of running a callback for each of them.
+OWNER_FILTER = filters.User(user_id=CFG.ADMIN_CHAT_ID)
+# Combined once here; every `&` builds a new filter object
+_OWNER_TEXT_NO_CMD = filters.TEXT & ~filters.COMMAND & OWNER_FILTER
+
+class OwnerCallbackQueryHandler(CallbackQueryHandler):
+    """CallbackQueryHandler that only accepts button presses from the owner."""
+
+    def check_update(self, update: object):
+        # filters.User looks at the message author, which for a button press is the bot itself
+        if not isinstance(update, Update) or not update.effective_user or update.effective_user.id != CFG.ADMIN_CHAT_ID:
+            return None
+        return super().check_update(update)
+
+class DuplicateUpdateHandler(BaseHandler):
     """
-    Checks if the incoming update is from the authorized user.
-    If not, it sends a message and stops the update from being processed further.
+    Drops updates Telegram delivers again after a failed or slow webhook response.
+    The last `maxlen` update ids are remembered; check_update only matches a repeated id,
+    so new updates pass through without running a callback.
     """
-    if update.effective_user:
-        user_id = update.effective_user.id
-        if user_id != config.ADMIN_CHAT_ID:
-            logger.warning(f"Unauthorized access attempt from user ID: {user_id}")
-            if update.message:
-                await update.message.reply_text("Maaf, bot ini hanya dapat digunakan oleh pemiliknya.")
-            elif update.callback_query:
-                await update.callback_query.answer("Maaf, Anda tidak diizinkan menggunakan bot ini.", show_alert=True)
-            raise ApplicationHandlerStop # Stop processing this update
+
+    def __init__(self, maxlen: int = 4096):
+        super().__init__(self._stop)
+        self._seen_update_ids: OrderedDict = OrderedDict()
+        self._maxlen = maxlen
+
+    def check_update(self, update: object) -> bool:
+        if not isinstance(update, Update):
+            return False
+        if update.update_id in self._seen_update_ids:
+            return True
+        self._seen_update_ids[update.update_id] = None
+        if len(self._seen_update_ids) > self._maxlen:
+            self._seen_update_ids.popitem(last=False)
+        return False
+
+    @staticmethod
+    async def _stop(update: Update, context: CallbackContext) -> None:
+        logger.info("Ignoring duplicate update %s.", update.update_id)
+        raise ApplicationHandlerStop # Stop processing this update
+
+async def start_update_query_count(update: Update, context: CallbackContext) -> None:
+    """Registered first, so every database query the update causes is counted together."""
+    database.start_update_query_count()
+
+async def check_update_query_count(update: Update, context: CallbackContext) -> None:
+    """Registered after all other groups, so it sees the update's full query count."""
+    database.check_update_query_count(update.update_id)
+
+# Users already logged as unauthorized, so a flood from one user logs a single warning
+_warned_user_ids: set[int] = set()
+
+async def log_unhandled_update(update: Update, context: CallbackContext) -> None:
+    """Registered last, so it only sees updates no other handler accepted, e.g. from other users."""
+    if not update.effective_user or update.effective_user.id == CFG.ADMIN_CHAT_ID:
+        return
+    user_id = update.effective_user.id
+    if user_id not in _warned_user_ids:
+        _warned_user_ids.add(user_id)
+        logger.warning("Unauthorized access attempt from user ID: %s", user_id)
+    # Answer button presses anyway, otherwise the client's spinner hangs until it times out
+    if update.callback_query:
+        await update.callback_query.answer("Maaf, Anda tidak diizinkan menggunakan bot ini.", show_alert=True)
+
+# Perintah bot Anda
+BOT_COMMANDS = (
+    BotCommand("start", "Mulai bot dan lihat bantuan"),
+    BotCommand("new_evaluation", "Buat catatan evaluasi baru"),
+    BotCommand("list_evaluations", "Lihat semua catatan evaluasi"),
+    BotCommand("cancel", "Batalkan operasi saat ini"),
+)
 
 async def post_init_telegram_app(application: Application) -> None:
     """Sets the bot's commands after initialization."""
-    commands = [
-        # Perintah bot Anda
-        BotCommand("start", "Mulai bot dan lihat bantuan"),
-        BotCommand("new_evaluation", "Buat catatan evaluasi baru"),
-        BotCommand("list_evaluations", "Lihat semua catatan evaluasi"),
-        BotCommand("cancel", "Batalkan operasi saat ini"),
-    ]
-    await application.bot.set_my_commands(commands)
+    await application.bot.set_my_commands(BOT_COMMANDS)
     logger.info("Custom bot commands have been set.")
     
     # Pindahkan pemanggilan scheduler.start_scheduler ke sini
     scheduler.start_scheduler(application.bot)
 
+async def post_shutdown_telegram_app(application: Application) -> None:
+    """Stops the reminder task once the application has shut down."""
+    await scheduler.shutdown_scheduler()
+
 # A shared list of fallbacks for all conversations
 # This ensures consistent behavior for cancellation and unknown commands.
 shared_fallbacks = [
-    CommandHandler("cancel", handlers.cancel_command),
+    CommandHandler("cancel", handlers.cancel_command, filters=OWNER_FILTER),
     # This handler catches any command that is not explicitly handled in a state.
     # It reminds the user they are in a conversation.
-    MessageHandler(filters.COMMAND, handlers.unknown_command_in_conv)
+    MessageHandler(filters.COMMAND & OWNER_FILTER, handlers.unknown_command_in_conv)
 ]
 
+# Each button action gets its own handler, so PTB routes on a compiled pattern and hands the
+# match (group 1 = evaluation id or page) to the callback via context.matches. PTB tries the
+# handlers in order, so the most frequent buttons (the reminder toggles) come first.
+CALLBACK_ROUTES = tuple(
+    (re.compile(pattern, re.ASCII), callback) for pattern, callback in (
+        (r"^disable_reminder_(\d+)$", handlers.disable_reminder_callback),
+        (r"^enable_reminder_(\d+)$", handlers.enable_reminder_callback),
+        (r"^list_page_(\d+)$", handlers.list_page_callback),
+        (r"^delete_eval_(\d+)$", handlers.delete_eval_callback),
+        (r"^confirm_delete_(\d+)$", handlers.confirm_delete_callback),
+        (r"^cancel_delete_(\d+)$", handlers.cancel_delete_callback),
+    )
+)
+
 def setup_telegram_handlers(application: Application):
     """
     Sets up all Telegram bot handlers.
     This function is separated to be called during FastAPI startup.
     """
-    # Add the pre_update callback for access control. Group -1 ensures it runs first.
-    application.add_handler(TypeHandler(Update, pre_update_callback), group=-1) # type: ignore
+    if CFG.SQL_QUERY_WARN_THRESHOLD:
+        # Updates are processed one at a time in one task, so the count spans all groups below
+        application.add_handler(TypeHandler(Update, start_update_query_count), group=-2)
+        application.add_handler(TypeHandler(Update, check_update_query_count), group=1)
+
+    # Group -1 runs before the handlers below, so a re-delivered update is dropped before they see it
+    application.add_handler(DuplicateUpdateHandler(), group=-1)
 
     # Add handlers
-    application.add_handler(CommandHandler("start", handlers.start_command))
-    application.add_handler(CommandHandler("list_evaluations", handlers.list_evaluations_command))
+    application.add_handler(CommandHandler("start", handlers.start_command, filters=OWNER_FILTER))
+    application.add_handler(CommandHandler("list_evaluations", handlers.list_evaluations_command, filters=OWNER_FILTER))
     
     # Conversation handler for new evaluation
+    TEXT_NOTE, IMAGE_NOTE = handlers.TEXT_NOTE, handlers.IMAGE_NOTE
+    # Izinkan pengguna untuk memulai ulang percakapan kapan saja
+    new_evaluation_handler = CommandHandler("new_evaluation", handlers.new_evaluation_command, filters=OWNER_FILTER)
     new_evaluation_conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("new_evaluation", handlers.new_evaluation_command)],
+        entry_points=[new_evaluation_handler],
         states={
-            handlers.TEXT_NOTE: [
-                # Izinkan pengguna untuk memulai ulang percakapan kapan saja
-                CommandHandler("new_evaluation", handlers.new_evaluation_command),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.receive_text_note)
+            TEXT_NOTE: [
+                new_evaluation_handler,
+                MessageHandler(_OWNER_TEXT_NO_CMD, handlers.receive_text_note)
             ],
-            handlers.IMAGE_NOTE: [
-                # Izinkan pengguna untuk memulai ulang percakapan kapan saja
-                CommandHandler("new_evaluation", handlers.new_evaluation_command),
-                MessageHandler(filters.PHOTO, handlers.receive_image_note),
-                CommandHandler("done", handlers.receive_image_note),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.receive_image_note)
+            IMAGE_NOTE: [
+                new_evaluation_handler,
+                MessageHandler(filters.PHOTO & OWNER_FILTER, handlers.receive_image_note),
+                CommandHandler("done", handlers.receive_image_note, filters=OWNER_FILTER),
+                MessageHandler(_OWNER_TEXT_NO_CMD, handlers.receive_image_note)
             ],
         },
         fallbacks=shared_fallbacks,
@@ -90,9 +179,12 @@ def setup_telegram_handlers(application: Application):
     )
     application.add_handler(new_evaluation_conv_handler)
     
-    # Callback query handler untuk tombol lain (disable, delete flow)
-    other_buttons_pattern = r"^(enable_reminder|disable_reminder|delete_eval|confirm_delete|cancel_delete)_\d+$"
-    application.add_handler(CallbackQueryHandler(handlers.button_callback_handler, pattern=other_buttons_pattern))
+    # Callback query handler untuk tombol lain (disable, delete flow).
+    for pattern, callback in CALLBACK_ROUTES:
+        application.add_handler(OwnerCallbackQueryHandler(callback, pattern=pattern))
+
+    # Anything left over, e.g. updates from other users, is only logged
+    application.add_handler(TypeHandler(Update, log_unhandled_update))
     logger.info("Telegram handlers set up.")
 
 def main() -> None:
@@ -103,29 +195,43 @@ def main() -> None:
     # Initialize database
     database.init_db()
 
-    # Buat objek persistensi untuk menyimpan status percakapan
-    persistence = PicklePersistence(filepath="bot_persistence.pickle")
+    # Status percakapan disimpan di database yang sama, satu baris per key
+    bot_persistence = persistence.DatabasePersistence()
 
     # Create the Application and pass your bot's token.
-    telegram_app = Application.builder().token(config.BOT_TOKEN).persistence(persistence).post_init(post_init_telegram_app).build()
+    # The rate limiter queues bursts (e.g. a concurrently sent /list_evaluations) instead of hitting HTTP 429.
+    telegram_app = (
+        Application.builder()
+        .token(CFG.BOT_TOKEN)
+        # One HTTP/2 connection multiplexes the concurrent sends; the larger pool covers bursts
+        .request(HTTPXRequest(connection_pool_size=64, http_version="2"))
+        .persistence(bot_persistence)
+        # Every message the bot sends is HTML, so set it once instead of on each call
+        .defaults(Defaults(parse_mode=ParseMode.HTML, link_preview_options=LinkPreviewOptions(is_disabled=True)))
+        .rate_limiter(AIORateLimiter())
+        .post_init(post_init_telegram_app)
+        .post_shutdown(post_shutdown_telegram_app)
+        .build()
+    )
 
     # Setup all Telegram handlers
     setup_telegram_handlers(telegram_app)
     
     # Jalankan bot dalam mode webhook
-    logger.info(f"Listening on http://127.0.0.1:{config.PORT}")
-    logger.info(f"Webhook will be set to {config.WEBHOOK_URL}/{config.WEBHOOK_PATH}")
+    logger.info("Listening on http://127.0.0.1:%s", CFG.PORT)
+    logger.info("Webhook will be set to %s/%s", CFG.WEBHOOK_URL, CFG.WEBHOOK_PATH)
     telegram_app.run_webhook(
         listen="127.0.0.1",  # Listen on localhost as requested
-        port=config.PORT,
-        url_path=config.WEBHOOK_PATH,
-        webhook_url=f"{config.WEBHOOK_URL}/{config.WEBHOOK_PATH}"
+        port=CFG.PORT,
+        url_path=CFG.WEBHOOK_PATH,
+        webhook_url=f"{CFG.WEBHOOK_URL}/{CFG.WEBHOOK_PATH}",
+        max_connections=100,  # Let Telegram deliver up to 100 updates in parallel (default 40)
+        # The bot only handles messages and button presses; Telegram doesn't need to send anything else
+        allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY]
     )
 
 if __name__ == "__main__":
     try:
         main()
     except Exception as e:
-        logger.error(f"An error occurred: {e}")
-        # Ensure scheduler is shut down on error
-        scheduler.shutdown_scheduler()
\ No newline at end of file
+        logger.error("An error occurred: %s", e)
\ No newline at end of file
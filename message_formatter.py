@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import Tuple, Optional
 from database import EvaluationDTO # Import the DTO
 
@@ -7,24 +8,25 @@ def format_evaluation_message(eval_item: EvaluationDTO, include_image_info: bool
     Formats an evaluation item into a human-readable message.
     Returns a tuple: (formatted_text_message, image_file_id_if_any)
     """
-    message_parts = []
-    message_parts.append(f"🆔 <b>ID:</b> {eval_item.id}")
-    message_parts.append(f"⏰ <b>Waktu:</b> {eval_item.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+    # The DTO is not hashable, so the cached formatter is keyed on the fields it reads
+    formatted_text = _format_evaluation_text(
+        eval_item.id, eval_item.timestamp, eval_item.text_note, bool(eval_item.image_file_id),
+        eval_item.reminder_enabled, include_image_info, include_reminder_info
+    )
+    return formatted_text, eval_item.image_file_id
 
-    if eval_item.text_note:
-        message_parts.append(f"📝 <b>Catatan:</b>")
-        message_parts.append(f"<b>{eval_item.text_note}</b>")
-    else:
-        message_parts.append(f"📝 <b>Catatan:</b> Tidak ada catatan teks.")
-
-    if include_image_info:
-        if eval_item.image_file_id:
-            message_parts.append(f"📸 <b>Gambar:</b> Ada")
-        else:
-            message_parts.append(f"📸 <b>Gambar:</b> Tidak ada")
-
-    if include_reminder_info:
-        reminder_status = "✅ Aktif" if eval_item.reminder_enabled else "❌ Tidak Aktif"
-        message_parts.append(f"🔔 <b>Pengingat Harian Acak:</b> {reminder_status}")
-
-    return "\n".join(message_parts), eval_item.image_file_id
\ No newline at end of file
+@lru_cache(maxsize=1024)
+def _format_evaluation_text(eval_id: int, timestamp: datetime, text_note: Optional[str], has_image: bool,
+                            reminder_enabled: bool, include_image_info: bool, include_reminder_info: bool) -> str:
+    """Builds the message text; the same evaluation is rendered again on every list, redraw and reminder."""
+    note_lines = (f"📝 <b>Catatan:</b>\n<b>{text_note}</b>" if text_note
+                  else "📝 <b>Catatan:</b> Tidak ada catatan teks.")
+    lines = (
+        f"🆔 <b>ID:</b> {eval_id}",
+        f"⏰ <b>Waktu:</b> {timestamp:%Y-%m-%d %H:%M:%S}",
+        note_lines,
+        *((f"📸 <b>Gambar:</b> {'Ada' if has_image else 'Tidak ada'}",) if include_image_info else ()),
+        *((f"🔔 <b>Pengingat Harian Acak:</b> {'✅ Aktif' if reminder_enabled else '❌ Tidak Aktif'}",)
+          if include_reminder_info else ()),
+    )
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+import json
+import logging
+import pickle
+from typing import Optional
+
+from telegram.ext import BasePersistence
+
+import database
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Namespaces in the persistence_kv table
+_USER_DATA = 'user_data'
+_CHAT_DATA = 'chat_data'
+_BOT_DATA = 'bot_data'
+_CALLBACK_DATA = 'callback_data'
+# bot_data and callback_data are single values, stored under this key
+_SINGLE_KEY = ''
+
+def _dumps(data) -> bytes:
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load(namespace: str) -> dict:
+    return {key: pickle.loads(value) for key, value in database.load_persistence_namespace(namespace).items()}
+
+def _conversation_namespace(name: str) -> str:
+    return f'conversation:{name}'
+
+class DatabasePersistence(BasePersistence):
+    """
+    Persistence backed by the bot's own database. Every user/chat/bot data entry and
+    conversation state is one row in persistence_kv, so PTB's periodic flush only writes the
+    keys that changed instead of pickling the whole state into one file.
+    """
+
+    def __init__(self, update_interval: float = 60):
+        super().__init__(update_interval=update_interval)
+
+    async def get_user_data(self) -> dict:
+        return {int(key): data for key, data in _load(_USER_DATA).items()}
+
+    async def get_chat_data(self) -> dict:
+        return {int(key): data for key, data in _load(_CHAT_DATA).items()}
+
+    async def get_bot_data(self) -> dict:
+        return _load(_BOT_DATA).get(_SINGLE_KEY, {})
+
+    async def get_callback_data(self) -> Optional[tuple]:
+        return _load(_CALLBACK_DATA).get(_SINGLE_KEY)
+
+    async def get_conversations(self, name: str) -> dict:
+        # Conversation keys are tuples of ints, stored as JSON arrays
+        return {tuple(json.loads(key)): state for key, state in _load(_conversation_namespace(name)).items()}
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        if new_state is None:
+            # The conversation ended, so its row is no longer needed
+            database.delete_persistence_entry(_conversation_namespace(name), json.dumps(key))
+        else:
+            database.save_persistence_entry(_conversation_namespace(name), json.dumps(key), _dumps(new_state))
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        database.save_persistence_entry(_USER_DATA, str(user_id), _dumps(data))
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        database.save_persistence_entry(_CHAT_DATA, str(chat_id), _dumps(data))
+
+    async def update_bot_data(self, data: dict) -> None:
+        database.save_persistence_entry(_BOT_DATA, _SINGLE_KEY, _dumps(data))
+
+    async def update_callback_data(self, data: tuple) -> None:
+        database.save_persistence_entry(_CALLBACK_DATA, _SINGLE_KEY, _dumps(data))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        database.delete_persistence_entry(_USER_DATA, str(user_id))
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        database.delete_persistence_entry(_CHAT_DATA, str(chat_id))
+
+    # Only this process writes the table, so there is nothing newer to pull in before an update
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        # Every update_* call is already committed
+        pass
@@ -1,9 +1,8 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 import random, asyncio
+from typing import Final, Optional
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler # Ubah ke AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from telegram import Bot
 
 import database
@@ -12,17 +11,23 @@ import message_formatter # Import the new module
 # Get a logger for this module
 logger = logging.getLogger(__name__)
 
-# Inisialisasi scheduler dengan zona waktu UTC
-scheduler = AsyncIOScheduler(timezone='UTC') # Ubah ke AsyncIOScheduler
+# The daily reminder runs as one asyncio task on the bot's event loop
+_task: Optional[asyncio.Task] = None
 
 JOB_ID = 'daily_random_reminder'
-
-async def check_and_send_daily_reminders(bot: Bot):
+# Waktu acak untuk hari berikutnya dipilih setiap hari pukul 00:01 UTC
+_RESCHEDULE_TIME = time(0, 1)
+# Static reminder texts, built once at import
+REMINDER_HEADER_TEXT: Final = "🔔 Waktunya untuk evaluasi harian Anda! 🔔📝"
+REMINDER_SEPARATOR_TEXT: Final = "---"
+# Chats whose reminders are sent at the same time; the bot's rate limiter paces the rest
+_SEND_CONCURRENCY = 3
+
+def _todays_reminder_time(now_utc: datetime) -> Optional[datetime]:
     """
-    Runs every minute. It schedules a random time for today's reminder if not already set.
-    If the current time matches the scheduled time, it sends the reminders.
+    Picks a random time for today's reminder if not already set and returns it, or None if it has passed.
+    The chosen time is kept in the job_state table, so a restart reuses it.
     """
-    now_utc = datetime.utcnow()
     job_state = database.get_or_create_job_state(JOB_ID)
 
     # Check if we need to schedule a new time for today
@@ -32,68 +37,113 @@ async def check_and_send_daily_reminders(bot: Bot):
         random_minute = random.randint(0, 59)
         new_scheduled_time = now_utc.replace(hour=random_hour, minute=random_minute, second=0, microsecond=0)
         
-        logger.info(f"Scheduler: New random time for today is {new_scheduled_time.strftime('%H:%M')} UTC.")
+        logger.info("Scheduler: New random time for today is %02d:%02d UTC.", new_scheduled_time.hour, new_scheduled_time.minute)
         database.update_job_state(JOB_ID, new_scheduled_time)
         job_state.scheduled_time = new_scheduled_time
 
-    # Check if it's time to run the job
-    # We check a 1-minute window to ensure it runs even with minor delays.
-    if job_state.scheduled_time <= now_utc < job_state.scheduled_time + timedelta(minutes=1):
-        logger.info(f"Scheduler: It's time to send daily reminders at {now_utc.strftime('%H:%M')} UTC.")
-        
-        # Fetch all evaluations with reminders enabled
-        all_active_evals = database.get_all_active_reminders()
-
-        if not all_active_evals:
-            logger.info("Scheduler: No active reminders to send.")
-            return
-
-        # --- LOGIKA BARU: Pilih 2 evaluasi secara acak ---
-        REMINDER_LIMIT = 2
-        num_to_sample = min(len(all_active_evals), REMINDER_LIMIT)
-        selected_evaluations = random.sample(all_active_evals, num_to_sample)
-
-        logger.info(f"Scheduler: Found {len(all_active_evals)} active reminders. Randomly selected {len(selected_evaluations)} to send.")
-
-        # Send header message
-        user_id = selected_evaluations[0].user_id # Assuming one user
-        await bot.send_message(
-            chat_id=user_id,
-            text="🔔 Waktunya untuk evaluasi harian Anda! 🔔📝"
-        )
-
-        for eval_item in selected_evaluations:
-            logger.info(f"Scheduler: Sending reminder for evaluation ID {eval_item.id} to user {eval_item.user_id}.")
+    # Like the old per-minute check, a start within one minute after the chosen time still sends
+    if job_state.scheduled_time + timedelta(minutes=1) <= now_utc:
+        logger.info("Scheduler: Today's reminder time has already passed.")
+        return None
+    return job_state.scheduled_time
+
+async def _daily_loop(bot: Bot):
+    """Sleeps until today's reminder time, sends the reminders, then waits for the next day."""
+    while True:
+        now_utc = database.utc_now()
+        fire_at = _todays_reminder_time(now_utc)
+        if fire_at is not None:
+            await asyncio.sleep(max(0.0, (fire_at - database.utc_now()).total_seconds()))
+            try:
+                await send_daily_reminders(bot)
+            except Exception:
+                logger.exception("Scheduler: Sending daily reminders failed.")
+
+        next_day = datetime.combine(now_utc.date() + timedelta(days=1), _RESCHEDULE_TIME)
+        await asyncio.sleep(max(0.0, (next_day - database.utc_now()).total_seconds()))
+
+async def _send_reminders_to_chat(bot: Bot, evaluations: list, semaphore: asyncio.Semaphore) -> list:
+    """Sends the given reminders, all for one chat, one after another. Returns the ids that were delivered."""
+    sent_ids = []
+    async with semaphore:
+        for eval_item in evaluations:
+            logger.info("Scheduler: Sending reminder for evaluation ID %s to user %s.", eval_item.id, eval_item.user_id)
             try:
                 formatted_text, image_file_id = message_formatter.format_evaluation_message(eval_item, include_reminder_info=False)
-                await bot.send_message(chat_id=eval_item.user_id, text=formatted_text, parse_mode='HTML')
+                await bot.send_message(chat_id=eval_item.user_id, text=formatted_text)
 
                 if image_file_id:
                     try:
                         await bot.send_photo(chat_id=eval_item.user_id, photo=image_file_id)
                     except Exception as e:
-                        logger.error(f"Gagal mengirim foto untuk eval {eval_item.id} ke user {eval_item.user_id}: {e}")
+                        logger.error("Gagal mengirim foto untuk eval %s ke user %s: %s", eval_item.id, eval_item.user_id, e)
                 
-                await bot.send_message(chat_id=eval_item.user_id, text="---")
-                await asyncio.sleep(1) # Small delay to avoid rate limiting
+                await bot.send_message(chat_id=eval_item.user_id, text=REMINDER_SEPARATOR_TEXT)
+                sent_ids.append(eval_item.id)
             except Exception as e:
-                logger.error(f"Gagal mengirim pengingat untuk eval {eval_item.id} ke user {eval_item.user_id}: {e}")
+                logger.error("Gagal mengirim pengingat untuk eval %s ke user %s: %s", eval_item.id, eval_item.user_id, e)
+    return sent_ids
+
+async def send_daily_reminders(bot: Bot):
+    """Sends today's reminders. Runs once, at the random time picked for the day."""
+    now_utc = database.utc_now()
+    logger.info("Scheduler: It's time to send daily reminders at %02d:%02d UTC.", now_utc.hour, now_utc.minute)
+
+    # --- LOGIKA BARU: Pilih 2 evaluasi secara acak ---
+    REMINDER_LIMIT = 2
+    # The database picks the random sample among the reminders not yet sent today
+    selected_evaluations = database.get_due_reminders_sample(REMINDER_LIMIT)
+
+    if not selected_evaluations:
+        logger.info("Scheduler: No active reminders to send.")
+        return
+
+    logger.info("Scheduler: Randomly selected %s active reminders to send.", len(selected_evaluations))
+
+    # Send header message
+    user_id = selected_evaluations[0].user_id # Assuming one user
+    await bot.send_message(
+        chat_id=user_id,
+        text=REMINDER_HEADER_TEXT
+    )
+
+    # Group by chat: one chat's reminders go out in order so their text, photo and separator
+    # don't interleave, while different chats are sent concurrently
+    evaluations_by_chat = {}
+    for eval_item in selected_evaluations:
+        evaluations_by_chat.setdefault(eval_item.user_id, []).append(eval_item)
+    semaphore = asyncio.Semaphore(_SEND_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_send_reminders_to_chat(bot, items, semaphore) for items in evaluations_by_chat.values()),
+        return_exceptions=True
+    )
+    sent_ids = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Gagal mengirim pengingat: %s", result)
+        else:
+            sent_ids.extend(result)
+
+    # Record every delivered reminder in one UPDATE instead of one transaction each
+    database.mark_reminders_sent(sent_ids)
 
 
 def start_scheduler(bot: Bot):
     """
-    Menambahkan tugas ke penjadwal dan memulainya.
-    Tugas akan berjalan setiap menit.
+    Memulai tugas pengingat harian di event loop yang sedang berjalan.
+    Setiap hari pukul 00:01 UTC waktu acak yang baru dipilih.
     """
-    if not scheduler.running:
-        # Jalankan tugas 'check_and_send_daily_reminders' setiap menit
-        scheduler.add_job(check_and_send_daily_reminders, CronTrigger(minute='*'), args=[bot])
-        scheduler.start()
-        logger.info("Scheduler started. Reminder job will run every minute.")
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_daily_loop(bot), name=JOB_ID)
+        logger.info("Scheduler started. Reminders are rescheduled daily at 00:01 UTC.")
 
 
-def shutdown_scheduler():
+async def shutdown_scheduler():
     """Mematikan penjadwal dengan aman."""
-    if scheduler.running:
-        scheduler.shutdown()
-        logger.info("Scheduler shut down.")
\ No newline at end of file
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+        logger.info("Scheduler shut down.")